@@ -4,13 +4,59 @@ Handles environment variables and application settings.
 """
 
 import os
-from typing import Optional
+from dataclasses import dataclass
+from typing import Optional, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
 
+@dataclass(frozen=True)
+class EnvSnapshot:
+    """Environment variables read exactly once at import time"""
+    host: str
+    port: int
+    environment: str
+    gemini_api_key: str
+    database_url: str
+    db_path: Optional[str]
+    frontend_url: Optional[str]
+
+
+ENV = EnvSnapshot(
+    host=os.getenv("HOST", "0.0.0.0"),
+    port=int(os.getenv("PORT", 8000)),
+    environment=os.getenv("ENVIRONMENT", "development"),
+    gemini_api_key=os.getenv("GEMINI_API_KEY", ""),
+    database_url=os.getenv("DATABASE_URL", "sqlite:///smartlensocr.db"),
+    db_path=os.getenv("DB_PATH"),
+    frontend_url=os.getenv("FRONTEND_URL"),
+)
+
+# Origins always allowed outside production
+DEV_ORIGINS = (
+    "http://localhost:5173",  # Vite default dev server
+    "http://localhost:3000",  # Alternative dev port
+    "http://localhost:8000",  # Backend dev
+    "http://127.0.0.1:5173",
+    "http://127.0.0.1:3000",
+)
+
+
+def _build_allowed_origins(environment: str, frontend_url: Optional[str]) -> Tuple[str, ...]:
+    """Build the CORS allow-list once; FRONTEND_URL may list several comma-separated origins"""
+    if frontend_url is None:
+        frontend_url = "http://localhost:5173"
+    frontend_origins = tuple(url.strip() for url in frontend_url.split(",") if url.strip())
+    
+    # In production, only the configured frontend is allowed
+    if environment == "production":
+        return frontend_origins
+    
+    return tuple(dict.fromkeys(DEV_ORIGINS + frontend_origins))
+
+
 class Config:
     """Base configuration"""
     
@@ -20,35 +66,20 @@ class Config:
     DESCRIPTION = "Backend server for intelligent document OCR processing"
     
     # Server Settings
-    HOST = os.getenv("HOST", "0.0.0.0")
-    PORT = int(os.getenv("PORT", 8000))
-    ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+    HOST = ENV.host
+    PORT = ENV.port
+    ENVIRONMENT = ENV.environment
     DEBUG = ENVIRONMENT == "development"
     
     # API Keys
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+    GEMINI_API_KEY = ENV.gemini_api_key
     
     # Database
-    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///smartlensocr.db")
+    DATABASE_URL = ENV.database_url
     DB_PATH = os.path.join(os.path.dirname(__file__), "smartlensocr.db")
     
     # CORS
-    CORS_ORIGINS = [
-        "http://localhost:5173",  # Vite default dev server
-        "http://localhost:3000",  # Alternative dev port
-        "http://localhost:8000",  # Backend dev
-        "http://127.0.0.1:5173",
-        "http://127.0.0.1:3000",
-    ]
-    
-    # Add frontend URL if provided
-    frontend_url = os.getenv("FRONTEND_URL")
-    if frontend_url and frontend_url not in CORS_ORIGINS:
-        CORS_ORIGINS.append(frontend_url)
-    
-    # In production, be more restrictive
-    if ENVIRONMENT == "production":
-        CORS_ORIGINS = [frontend_url] if frontend_url else ["https://yourdomain.com"]
+    ALLOWED_ORIGINS = _build_allowed_origins(ENV.environment, ENV.frontend_url)
     
     # AI Settings
     GEMINI_MODEL_DETECT = "gemini-2.0-flash"
@@ -58,6 +89,8 @@ class Config:
     # Image Processing
     MAX_IMAGE_SIZE = 20 * 1024 * 1024  # 20MB
     SUPPORTED_FORMATS = ["image/png", "image/jpeg", "image/gif", "image/webp"]
+    GEMINI_MAX_IMAGE_EDGE = 1568  # Longest edge sent to Gemini, in pixels
+    GEMINI_JPEG_QUALITY = 85  # JPEG quality of images sent to Gemini
     
     # Credit System
     CREDITS_PER_DETECTION = 0  # Free
@@ -95,7 +128,7 @@ class TestingConfig(Config):
 
 def get_config() -> Config:
     """Get configuration based on environment"""
-    env = os.getenv("ENVIRONMENT", "development")
+    env = ENV.environment
     
     if env == "production":
         return ProductionConfig()
@@ -4,37 +4,37 @@ Main FastAPI application for handling OCR processing, user management, and credi
 """
 
 import os
-import json
+import re
 import base64
+import asyncio
 import sqlite3
-from datetime import datetime
-from typing import Optional, List
+import threading
+import time
+from typing import Awaitable, Optional, List
 from contextlib import contextmanager
 
 from fastapi import FastAPI, HTTPException, UploadFile, File, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from dotenv import load_dotenv
-import google.generativeai as genai
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict
 from PIL import Image
 import io
+import orjson
 
-# Load environment variables
-load_dotenv()
+from config import config, ENV
 
 # Initialize FastAPI app
-app = FastAPI(title="SmartLensOCR Backend", version="1.0.0")
+app = FastAPI(
+    title="SmartLensOCR Backend",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
 
 # Configure CORS for frontend communication
-# Allow only specific frontend URL(s) for security
-FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")  # Default for local development
-allow_origins = [
-    url.strip() for url in FRONTEND_URL.split(",") if url.strip()
-]  # Support multiple URLs separated by commas
-
+# The allow-list is built once in config from ENVIRONMENT and FRONTEND_URL
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=allow_origins,
+    allow_origins=config.ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["GET", "POST", "OPTIONS", "PUT", "DELETE"],
     allow_headers=["*"],
@@ -42,12 +42,40 @@ app.add_middleware(
     max_age=3600,  # Cache preflight for 1 hour
 )
 
-print(f"[SmartLensOCR] CORS allowed origins: {allow_origins}", flush=True)
+print(f"[SmartLensOCR] CORS allowed origins: {list(config.ALLOWED_ORIGINS)}", flush=True)
 
 # Configure Gemini API
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+# google.generativeai pulls in gRPC and protobuf, so it is imported on the
+# first OCR call rather than at startup
+GEMINI_API_KEY = ENV.gemini_api_key
+_genai_mod = None
+
+
+def _genai():
+    """Import and configure google.generativeai on first use"""
+    global _genai_mod
+    if _genai_mod is None:
+        import google.generativeai as genai
+        genai.configure(api_key=GEMINI_API_KEY)
+        _genai_mod = genai
+    return _genai_mod
+
+
+# Shared GenerativeModel instances, keyed by model name
+_MODELS = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def _get_model(name: str):
+    """Return the cached GenerativeModel for a model name, creating it on first use"""
+    model = _MODELS.get(name)
+    if model is None:
+        with _MODELS_LOCK:
+            model = _MODELS.get(name)
+            if model is None:
+                model = _MODELS[name] = _genai().GenerativeModel(name)
+    return model
+
 
 # Database configuration
 # Use /mnt for persistent storage (mounted Cloud Storage bucket in Cloud Run)
@@ -55,15 +83,31 @@ if GEMINI_API_KEY:
 DB_DIR = "/mnt" if os.path.exists("/mnt") else os.path.dirname(__file__)
 DB_PATH = os.path.join(DB_DIR, "smartlensocr.db")
 
-# Ensure DB directory exists
+# An explicit DB_PATH overrides the default location (e.g. per-worker test databases)
+if ENV.db_path:
+    DB_PATH = os.path.abspath(ENV.db_path)
+    DB_DIR = os.path.dirname(DB_PATH)
+
+# The /mnt bucket is a network filesystem, unlike a local disk
+_DB_ON_MOUNT = os.path.commonpath([os.path.abspath(DB_DIR), "/mnt"]) == "/mnt"
+
+# Ensure DB directory exists and is writable before the connection below opens it
 os.makedirs(DB_DIR, exist_ok=True)
+if not os.access(DB_DIR, os.W_OK):
+    raise RuntimeError(f"Database directory is not writable: {DB_DIR}")
 print(f"[SmartLensOCR] Database initialized at: {DB_PATH}", flush=True)
 
 # ============================================================================
 # MODELS
 # ============================================================================
 
+# Request payloads are read-only once validated; unknown fields are dropped
+_INPUT_MODEL_CONFIG = ConfigDict(extra="ignore", frozen=True)
+
+
 class BoundingBox(BaseModel):
+    model_config = _INPUT_MODEL_CONFIG
+    
     ymin: float
     xmin: float
     ymax: float
@@ -71,6 +115,8 @@ class BoundingBox(BaseModel):
 
 
 class TextRegion(BaseModel):
+    model_config = _INPUT_MODEL_CONFIG
+    
     id: str
     box: BoundingBox
     order: int
@@ -81,17 +127,23 @@ class TextRegion(BaseModel):
 
 class DetectRegionsRequest(BaseModel):
     """Request model for region detection"""
+    model_config = _INPUT_MODEL_CONFIG
+    
     imageBase64: str
 
 
 class ExtractTextRequest(BaseModel):
     """Request model for text extraction"""
+    model_config = _INPUT_MODEL_CONFIG
+    
     imageBase64: str
     regions: List[TextRegion]
 
 
 class UserCreateRequest(BaseModel):
     """Request model for user creation"""
+    model_config = _INPUT_MODEL_CONFIG
+    
     email: str
 
 
@@ -106,6 +158,8 @@ class UserResponse(BaseModel):
 
 class CreditUpdateRequest(BaseModel):
     """Request model for credit updates"""
+    model_config = _INPUT_MODEL_CONFIG
+    
     amount: int
 
 
@@ -121,7 +175,7 @@ class HealthResponse(BaseModel):
 
 def init_db():
     """Initialize SQLite database with required tables"""
-    with get_db() as conn:
+    with write_tx() as conn:
         conn.execute("""
             CREATE TABLE IF NOT EXISTS users (
                 id TEXT PRIMARY KEY,
@@ -144,29 +198,100 @@ def init_db():
             )
         """)
         
-        conn.commit()
+        # users.email is already indexed through its UNIQUE constraint
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_user ON transactions(user_id)")
+
+
+# Single long-lived connection shared by all requests. Writes go through
+# write_tx(), which serializes them on _DB_LOCK so transactions never interleave.
+_CONN = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+_CONN.row_factory = sqlite3.Row
+_CONN.executescript("""
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-20000;
+""")
+if _DB_ON_MOUNT:
+    # WAL needs real shared memory and locking, which the bucket mount does not
+    # provide; keep the rollback journal and fsync every commit
+    _CONN.executescript("""
+        PRAGMA journal_mode=DELETE;
+        PRAGMA synchronous=FULL;
+    """)
+else:
+    _CONN.executescript("""
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+    """)
+_DB_LOCK = threading.Lock()
+
+
+def get_db() -> sqlite3.Connection:
+    """Get the shared database connection"""
+    return _CONN
 
 
 @contextmanager
-def get_db():
-    """Get database connection context manager"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-    finally:
-        conn.close()
+def write_tx():
+    """Run a write transaction on the shared connection, committing on success"""
+    # A savepoint acts as BEGIN/COMMIT on its own, and nests cleanly when an
+    # outer transaction is already open (e.g. the per-test rollback fixture)
+    with _DB_LOCK:
+        _CONN.execute("SAVEPOINT write_tx")
+        try:
+            yield _CONN
+        except BaseException:
+            _CONN.execute("ROLLBACK TO write_tx")
+            _CONN.execute("RELEASE write_tx")
+            raise
+        _CONN.execute("RELEASE write_tx")
 
 
 # ============================================================================
 # GEMINI SERVICE LAYER
 # ============================================================================
 
+# Matches a response wrapped in a markdown code fence, capturing the body
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.S)
+
+
+def _prepare_for_gemini(image: Image.Image) -> dict:
+    """
+    Downscale an image to Gemini's working resolution and encode it as JPEG.
+    
+    The model resamples large inputs internally, so sending full-resolution
+    photos only costs bandwidth and tokens. Transparent areas are flattened
+    onto white so dark text on a transparent background stays visible.
+    """
+    edge = config.GEMINI_MAX_IMAGE_EDGE
+    scale = edge / max(image.size)
+    if image.format == "JPEG" and scale < 1:
+        # Let libjpeg decode at a reduced DCT scale (1/2, 1/4, 1/8) instead of
+        # decoding every pixel only to resample them away
+        image.draft(None, (max(1, int(image.width * scale)), max(1, int(image.height * scale))))
+    image.thumbnail((edge, edge), Image.LANCZOS)
+    
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        image = Image.new("RGB", rgba.size, "white")
+        image.paste(rgba, mask=rgba.getchannel("A"))
+    else:
+        image = image.convert("RGB")
+    
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=config.GEMINI_JPEG_QUALITY)
+    return {"mime_type": "image/jpeg", "data": buffer.getvalue()}
+
+
+def _load_for_gemini(image_data: bytes) -> dict:
+    """Decode image file bytes and prepare them for upload to Gemini"""
+    return _prepare_for_gemini(Image.open(io.BytesIO(image_data)))
+
+
 class GeminiService:
     """Service layer for Gemini API interactions"""
     
     @staticmethod
-    def detect_regions(base64_image: str) -> List[dict]:
+    async def detect_regions(base64_image: str) -> List[dict]:
         """
         Detect text regions in an image using Gemini's vision capabilities.
         
@@ -177,12 +302,28 @@ class GeminiService:
             List of detected text regions with bounding boxes
         """
         try:
-            # Decode base64 to bytes
-            image_data = base64.b64decode(base64_image)
-            image = Image.open(io.BytesIO(image_data))
+            # Decode base64 to bytes off the event loop
+            image_data = await asyncio.to_thread(base64.b64decode, base64_image)
+        except Exception as e:
+            raise Exception(f"Error detecting regions: {str(e)}")
+        
+        return await GeminiService.detect_regions_from_bytes(image_data)
+    
+    @staticmethod
+    async def detect_regions_from_bytes(image_data: bytes) -> List[dict]:
+        """
+        Detect text regions in raw image file bytes.
+        
+        Args:
+            image_data: Encoded image file contents (PNG, JPEG, ...)
             
-            # Initialize model
-            model = genai.GenerativeModel('gemini-2.0-flash')
+        Returns:
+            List of detected text regions with bounding boxes
+        """
+        try:
+            # Decoding, resizing and re-encoding are CPU-bound; keep them off the event loop
+            image_part = await asyncio.to_thread(_load_for_gemini, image_data)
+            model = _get_model(config.GEMINI_MODEL_DETECT)
             
             prompt = """Identify all major blocks of text in this image.
 
@@ -195,29 +336,31 @@ Coordinates must be in normalized range (0 to 1000).
 Return ONLY valid JSON array with objects containing: description, ymin, xmin, ymax, xmax
 No markdown, no code blocks, just raw JSON."""
 
-            response = model.generate_content([
+            response = await model.generate_content_async([
                 prompt,
-                image
+                image_part
             ])
             
             # Parse response as JSON
             response_text = response.text.strip()
             
             # Remove markdown code blocks if present
-            if response_text.startswith("```"):
-                response_text = response_text.split("```")[1]
-                if response_text.startswith("json"):
-                    response_text = response_text[4:]
+            match = _FENCE_RE.match(response_text)
+            if match:
+                response_text = match.group(1)
             
-            regions_data = json.loads(response_text)
+            regions_data = orjson.loads(response_text)
             
             return regions_data
             
+        except orjson.JSONDecodeError:
+            # Let endpoints report an unparseable model response as a 400
+            raise
         except Exception as e:
             raise Exception(f"Error detecting regions: {str(e)}")
     
     @staticmethod
-    def extract_text_from_regions(base64_image: str, regions: List[TextRegion]) -> str:
+    async def extract_text_from_regions(base64_image: str, regions: List[TextRegion]) -> str:
         """
         Extract text from specified regions using Gemini's OCR capabilities.
         
@@ -238,12 +381,11 @@ No markdown, no code blocks, just raw JSON."""
             if not active_regions:
                 return ""
             
-            # Decode base64 to bytes
-            image_data = base64.b64decode(base64_image)
-            image = Image.open(io.BytesIO(image_data))
+            # Decode and prepare the image off the event loop
+            image_data = await asyncio.to_thread(base64.b64decode, base64_image)
+            image_part = await asyncio.to_thread(_load_for_gemini, image_data)
             
-            # Initialize model
-            model = genai.GenerativeModel('gemini-2.0-flash')
+            model = _get_model(config.GEMINI_MODEL_EXTRACT)
             
             # Build regions description
             regions_description = "\n".join([
@@ -260,9 +402,9 @@ Regions to process (in order):
 
 Extract text exactly as it appears, maintaining formatting where possible."""
 
-            response = model.generate_content([
+            response = await model.generate_content_async([
                 prompt,
-                image
+                image_part
             ])
             
             return response.text.strip()
@@ -275,69 +417,73 @@ Extract text exactly as it appears, maintaining formatting where possible."""
 # USER MANAGEMENT
 # ============================================================================
 
+# SQL is kept in constants so every call hits sqlite3's prepared statement cache
+_USER_COLUMNS = "id, email, credits, isPro, created_at"
+_SQL_GET_USER_BY_ID = f"SELECT {_USER_COLUMNS} FROM users WHERE id = ?"
+_SQL_GET_USER_BY_EMAIL = f"SELECT {_USER_COLUMNS} FROM users WHERE email = ?"
+_SQL_INSERT_USER = "INSERT INTO users (id, email, credits, isPro) VALUES (?, ?, ?, ?)"
+_SQL_UPDATE_CREDITS = (
+    "UPDATE users SET credits = max(0, credits + ?) WHERE id = ? "
+    f"RETURNING {_USER_COLUMNS}"
+)
+_SQL_INSERT_TRANSACTION = (
+    "INSERT INTO transactions (user_id, amount, type, description) VALUES (?, ?, ?, ?)"
+)
+
+
 def get_user_by_id(user_id: str) -> Optional[dict]:
     """Retrieve user from database by ID"""
-    with get_db() as conn:
-        row = conn.execute(
-            "SELECT * FROM users WHERE id = ?", (user_id,)
-        ).fetchone()
-        return dict(row) if row else None
+    row = get_db().execute(_SQL_GET_USER_BY_ID, (user_id,)).fetchone()
+    return dict(row) if row else None
 
 
 def get_user_by_email(email: str) -> Optional[dict]:
     """Retrieve user from database by email"""
-    with get_db() as conn:
-        row = conn.execute(
-            "SELECT * FROM users WHERE email = ?", (email,)
-        ).fetchone()
-        return dict(row) if row else None
+    row = get_db().execute(_SQL_GET_USER_BY_EMAIL, (email,)).fetchone()
+    return dict(row) if row else None
 
 
 def create_user(user_id: str, email: str) -> dict:
     """Create new user in database"""
-    with get_db() as conn:
-        conn.execute(
-            "INSERT INTO users (id, email, credits, isPro) VALUES (?, ?, ?, ?)",
-            (user_id, email, 5, 0)
-        )
-        conn.commit()
+    with write_tx() as conn:
+        conn.execute(_SQL_INSERT_USER, (user_id, email, 5, 0))
     return get_user_by_id(user_id)
 
 
 def update_user_credits(user_id: str, amount: int) -> dict:
     """Update user credits (can be positive or negative)"""
-    with get_db() as conn:
-        user = conn.execute(
-            "SELECT credits FROM users WHERE id = ?", (user_id,)
-        ).fetchone()
+    with write_tx() as conn:
+        user = conn.execute(_SQL_UPDATE_CREDITS, (amount, user_id)).fetchone()
         
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        new_credits = max(0, user['credits'] + amount)
-        
         conn.execute(
-            "UPDATE users SET credits = ? WHERE id = ?",
-            (new_credits, user_id)
-        )
-        
-        conn.execute(
-            "INSERT INTO transactions (user_id, amount, type, description) VALUES (?, ?, ?, ?)",
+            _SQL_INSERT_TRANSACTION,
             (user_id, amount, "debit" if amount < 0 else "credit", "Credit adjustment")
         )
-        
-        conn.commit()
     
-    return get_user_by_id(user_id)
+    return dict(user)
 
 
 # ============================================================================
 # API ENDPOINTS
 # ============================================================================
 
+def _validate_config():
+    """Fail fast on misconfiguration before the app starts serving traffic"""
+    if not GEMINI_API_KEY:
+        raise RuntimeError("GEMINI_API_KEY is not configured")
+    if not config.ALLOWED_ORIGINS:
+        raise RuntimeError("FRONTEND_URL must contain at least one allowed origin")
+    if config.MAX_IMAGE_SIZE <= 0:
+        raise RuntimeError("MAX_IMAGE_SIZE must be greater than zero")
+
+
 @app.on_event("startup")
 async def startup():
-    """Initialize database on app startup"""
+    """Validate configuration and initialize database on app startup"""
+    _validate_config()
     init_db()
 
 
@@ -368,6 +514,11 @@ async def options_detect_regions():
     return {}
 
 
+@app.options("/api/detect-regions/binary")
+async def options_detect_regions_binary():
+    return {}
+
+
 @app.options("/api/extract-text")
 async def options_extract_text():
     return {}
@@ -390,26 +541,14 @@ async def create_or_get_user(request: UserCreateRequest):
     # Check if user exists
     existing_user = get_user_by_email(email)
     if existing_user:
-        return UserResponse(
-            id=existing_user['id'],
-            email=existing_user['email'],
-            credits=existing_user['credits'],
-            isPro=bool(existing_user['isPro']),
-            created_at=existing_user['created_at']
-        )
+        return UserResponse.model_validate(existing_user)
     
     # Create new user
     import uuid
     user_id = f"usr_{uuid.uuid4().hex[:12]}"
     user = create_user(user_id, email)
     
-    return UserResponse(
-        id=user['id'],
-        email=user['email'],
-        credits=user['credits'],
-        isPro=bool(user['isPro']),
-        created_at=user['created_at']
-    )
+    return UserResponse.model_validate(user)
 
 
 @app.get("/api/users/{user_id}", response_model=UserResponse)
@@ -419,13 +558,7 @@ async def get_user(user_id: str):
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return UserResponse(
-        id=user['id'],
-        email=user['email'],
-        credits=user['credits'],
-        isPro=bool(user['isPro']),
-        created_at=user['created_at']
-    )
+    return UserResponse.model_validate(user)
 
 
 @app.post("/api/users/{user_id}/credits")
@@ -433,13 +566,46 @@ async def update_credits(user_id: str, request: CreditUpdateRequest):
     """Update user credits"""
     user = update_user_credits(user_id, request.amount)
     
-    return UserResponse(
-        id=user['id'],
-        email=user['email'],
-        credits=user['credits'],
-        isPro=bool(user['isPro']),
-        created_at=user['created_at']
-    )
+    return UserResponse.model_validate(user)
+
+
+def _region_to_response(idx: int, region: dict, ts: int, base64_data: Optional[str] = None) -> dict:
+    """Convert a detected region into the shape the frontend expects"""
+    response = {
+        "id": f"region_{idx}_{ts}",
+        "description": region.get("description", "Untitled"),
+        "box": {
+            "ymin": region.get("ymin", 0),
+            "xmin": region.get("xmin", 0),
+            "ymax": region.get("ymax", 1000),
+            "xmax": region.get("xmax", 1000)
+        },
+        "order": idx + 1,
+        "isActive": True
+    }
+    if base64_data is not None:
+        response["base64Data"] = base64_data
+    return response
+
+
+async def _detection_response(detection: Awaitable[List[dict]]) -> dict:
+    """Await a region detection and shape its result for the frontend"""
+    try:
+        regions = await detection
+        
+        # Transform response to match frontend expectations
+        ts = int(time.time() * 1000)
+        response_regions = [
+            _region_to_response(idx, region, ts)
+            for idx, region in enumerate(regions)
+        ]
+        
+        return {"regions": response_regions}
+        
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid response format: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error detecting regions: {str(e)}")
 
 
 @app.post("/api/detect-regions")
@@ -456,34 +622,25 @@ async def detect_regions(request: DetectRegionsRequest):
     Returns:
         List of detected regions with bounding boxes and descriptions
     """
-    if not GEMINI_API_KEY:
-        raise HTTPException(status_code=500, detail="Gemini API key not configured")
+    return await _detection_response(GeminiService.detect_regions(request.imageBase64))
+
+
+@app.post("/api/detect-regions/binary")
+async def detect_regions_binary(file: UploadFile = File(...)):
+    """
+    Detect text regions in an image sent as a raw multipart upload.
     
-    try:
-        regions = GeminiService.detect_regions(request.imageBase64)
-        
-        # Transform response to match frontend expectations
-        response_regions = []
-        for idx, region in enumerate(regions):
-            response_regions.append({
-                "id": f"region_{idx}_{int(datetime.now().timestamp() * 1000)}",
-                "description": region.get("description", "Untitled"),
-                "box": {
-                    "ymin": region.get("ymin", 0),
-                    "xmin": region.get("xmin", 0),
-                    "ymax": region.get("ymax", 1000),
-                    "xmax": region.get("xmax", 1000)
-                },
-                "order": idx + 1,
-                "isActive": True
-            })
-        
-        return {"regions": response_regions}
+    Equivalent to /api/detect-regions, but avoids the base64 overhead of
+    sending the image inside a JSON body.
+    
+    Args:
+        file: Image file upload
         
-    except json.JSONDecodeError as e:
-        raise HTTPException(status_code=400, detail=f"Invalid response format: {str(e)}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error detecting regions: {str(e)}")
+    Returns:
+        List of detected regions with bounding boxes and descriptions
+    """
+    contents = await file.read()
+    return await _detection_response(GeminiService.detect_regions_from_bytes(contents))
 
 
 @app.post("/api/extract-text")
@@ -500,11 +657,8 @@ async def extract_text(request: ExtractTextRequest):
     Returns:
         Extracted text from all active regions
     """
-    if not GEMINI_API_KEY:
-        raise HTTPException(status_code=500, detail="Gemini API key not configured")
-    
     try:
-        text = GeminiService.extract_text_from_regions(
+        text = await GeminiService.extract_text_from_regions(
             request.imageBase64,
             request.regions
         )
@@ -528,35 +682,22 @@ async def process_document(file: UploadFile = File(...)):
     Returns:
         Detected regions from the image
     """
-    if not GEMINI_API_KEY:
-        raise HTTPException(status_code=500, detail="Gemini API key not configured")
-    
     try:
-        # Read file content
         contents = await file.read()
         
-        # Convert to base64
-        base64_image = base64.b64encode(contents).decode("utf-8")
-        
-        # Detect regions
-        regions = GeminiService.detect_regions(base64_image)
+        # Detect regions while the response payload is encoded off the event loop
+        regions, encoded = await asyncio.gather(
+            GeminiService.detect_regions_from_bytes(contents),
+            asyncio.to_thread(base64.b64encode, contents)
+        )
+        base64_image = encoded.decode("utf-8")
         
         # Transform response
-        response_regions = []
-        for idx, region in enumerate(regions):
-            response_regions.append({
-                "id": f"region_{idx}_{int(datetime.now().timestamp() * 1000)}",
-                "description": region.get("description", "Untitled"),
-                "box": {
-                    "ymin": region.get("ymin", 0),
-                    "xmin": region.get("xmin", 0),
-                    "ymax": region.get("ymax", 1000),
-                    "xmax": region.get("xmax", 1000)
-                },
-                "order": idx + 1,
-                "isActive": True,
-                "base64Data": base64_image
-            })
+        ts = int(time.time() * 1000)
+        response_regions = [
+            _region_to_response(idx, region, ts, base64_image)
+            for idx, region in enumerate(regions)
+        ]
         
         return {"regions": response_regions}
         
@@ -584,6 +725,7 @@ async def root():
             },
             "ocr": {
                 "detect_regions": "POST /api/detect-regions",
+                "detect_regions_binary": "POST /api/detect-regions/binary",
                 "extract_text": "POST /api/extract-text",
                 "process_document": "POST /api/process-document"
             }
@@ -598,12 +740,9 @@ async def root():
 if __name__ == "__main__":
     import uvicorn
     
-    port = int(os.getenv("PORT", 8000))
-    host = os.getenv("HOST", "0.0.0.0")
-    
     uvicorn.run(
         "main:app",
-        host=host,
-        port=port,
-        reload=True if os.getenv("ENVIRONMENT") == "development" else False
+        host=ENV.host,
+        port=ENV.port,
+        reload=ENV.environment == "development"
     )
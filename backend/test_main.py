@@ -4,55 +4,75 @@ Run with: pytest
 """
 
 import pytest
+import io
 import json
-from fastapi.testclient import TestClient
-from main import app
-import os
+import base64
+import sqlite3
+import orjson
+from PIL import Image, ImageDraw
 
-client = TestClient(app)
+# Constant request bodies, serialized once instead of on every call
+_JSON_HEADERS = {"content-type": "application/json"}
+_CREDIT_ADD = orjson.dumps({"amount": 10})
+_CREDIT_SUB = orjson.dumps({"amount": -2})
+_CREDIT_DRAIN = orjson.dumps({"amount": -100})
 
+# Constant responses, compared as raw bytes instead of decoding JSON
+_EXPECTED_HEALTH = orjson.dumps({"status": "healthy", "version": "1.0.0"})
+_EXPECTED_ROOT_NAME = b'"name":"SmartLensOCR Backend API"'
 
-class TestHealth:
-    """Health check endpoint tests"""
+
+class TestSmoke:
+    """Health check and root endpoint tests"""
     
-    def test_health_check(self):
-        """Test health check endpoint"""
-        response = client.get("/health")
+    @pytest.mark.parametrize(
+        "path,validator",
+        [
+            ("/health", lambda body: body == _EXPECTED_HEALTH),
+            ("/", lambda body: _EXPECTED_ROOT_NAME in body
+                and b'"version":' in body and b'"endpoints":' in body),
+        ],
+        ids=["health", "root"]
+    )
+    def test_smoke(self, client, path, validator):
+        """Test that static informational endpoints respond as expected"""
+        response = client.get(path)
         assert response.status_code == 200
-        assert response.json()["status"] == "healthy"
+        assert validator(response.content)
 
 
 class TestUserManagement:
     """User management endpoint tests"""
     
-    def test_create_user(self):
+    def test_create_user(self, client, unique_email):
         """Test creating a new user"""
         response = client.post(
             "/api/users",
-            json={"email": "test@example.com"}
+            json={"email": unique_email}
         )
         assert response.status_code == 200
         data = response.json()
-        assert data["email"] == "test@example.com"
+        assert data["email"] == unique_email
         assert data["credits"] == 5
         assert data["isPro"] == False
         self.user_id = data["id"]
     
-    def test_get_existing_user(self):
+    @pytest.mark.asyncio
+    async def test_get_existing_user(self, aclient, unique_email):
         """Test retrieving an existing user returns same data"""
         # Create first
-        response1 = client.post(
+        response1 = await aclient.post(
             "/api/users",
-            json={"email": "test2@example.com"}
+            json={"email": unique_email}
         )
         user_id = response1.json()["id"]
         
         # Retrieve
-        response2 = client.get(f"/api/users/{user_id}")
+        response2 = await aclient.get(f"/api/users/{user_id}")
         assert response2.status_code == 200
-        assert response2.json()["email"] == "test2@example.com"
+        assert response2.json()["email"] == unique_email
     
-    def test_get_user_not_found(self):
+    def test_get_user_not_found(self, client):
         """Test retrieving non-existent user"""
         response = client.get("/api/users/nonexistent")
         assert response.status_code == 404
@@ -61,97 +81,250 @@ class TestUserManagement:
 class TestCreditSystem:
     """Credit management tests"""
     
-    def test_update_credits_positive(self):
-        """Test adding credits to user"""
-        # Create user
-        create_response = client.post(
-            "/api/users",
-            json={"email": "credits@example.com"}
-        )
-        user_id = create_response.json()["id"]
-        initial_credits = create_response.json()["credits"]
-        
-        # Update credits
+    @pytest.mark.parametrize(
+        "body,expected",
+        [
+            (_CREDIT_ADD, lambda initial: initial + 10),
+            (_CREDIT_SUB, lambda initial: initial - 2),
+            (_CREDIT_DRAIN, lambda initial: 0),
+        ],
+        ids=["add", "deduct", "never-negative"]
+    )
+    def test_update_credits(self, client, fresh_user, body, expected):
+        """Test adding and deducting credits, clamped at zero"""
         response = client.post(
-            f"/api/users/{user_id}/credits",
-            json={"amount": 10}
+            f"/api/users/{fresh_user['id']}/credits",
+            content=body,
+            headers=_JSON_HEADERS
         )
         assert response.status_code == 200
-        assert response.json()["credits"] == initial_credits + 10
+        assert response.json()["credits"] == expected(fresh_user["credits"])
+
+
+class TestTransactionModel:
+    """Transaction model batch inserts"""
     
-    def test_update_credits_negative(self):
-        """Test deducting credits from user"""
-        # Create user
-        create_response = client.post(
-            "/api/users",
-            json={"email": "debit@example.com"}
+    @pytest.fixture
+    def transactions(self, client):
+        """Provide the Transaction model once app startup has created its table"""
+        from models import Transaction
+        return Transaction
+    
+    def test_create_many_inserts_batch(self, transactions, fresh_user):
+        """Test that a batch insert returns its row count and the rows are stored"""
+        user_id = fresh_user["id"]
+        inserted = transactions.create_many([
+            (user_id, 3, "credit", "Top up"),
+            (user_id, -1, "debit", "Extraction"),
+        ])
+        assert inserted == 2
+        stored = transactions.get_by_user(user_id)
+        assert sorted(t["amount"] for t in stored) == [-1, 3]
+    
+    def test_create_many_is_all_or_nothing(self, transactions, fresh_user):
+        """Test that one invalid row leaves the whole batch uninserted"""
+        user_id = fresh_user["id"]
+        with pytest.raises(sqlite3.IntegrityError):
+            transactions.create_many([
+                (user_id, 3, "credit", "Top up"),
+                (user_id, None, "debit", "Missing amount"),
+            ])
+        assert transactions.get_by_user(user_id) == []
+
+
+class TestExtractText:
+    """Text extraction tests that do not reach Gemini"""
+    
+    def test_no_active_regions_skips_image_decode(self, client):
+        """Test that inactive regions return empty text without decoding the image"""
+        response = client.post(
+            "/api/extract-text",
+            json={
+                "imageBase64": "not-an-image",
+                "regions": [{
+                    "id": "region_0",
+                    "box": {"ymin": 0, "xmin": 0, "ymax": 1000, "xmax": 1000},
+                    "order": 1,
+                    "description": "Body",
+                    "isActive": False
+                }]
+            }
         )
-        user_id = create_response.json()["id"]
-        initial_credits = create_response.json()["credits"]
+        assert response.status_code == 200
+        assert response.json()["extractedText"] == ""
+
+
+class TestPrepareForGemini:
+    """Image preparation before upload to Gemini"""
+    
+    @pytest.fixture
+    def prepare(self, app):
+        """Provide _prepare_for_gemini without importing main at collection"""
+        from main import _prepare_for_gemini
+        return _prepare_for_gemini
+    
+    @staticmethod
+    def _decode(blob):
+        assert blob["mime_type"] == "image/jpeg"
+        return Image.open(io.BytesIO(blob["data"]))
+    
+    def test_downscales_longest_edge(self, prepare):
+        """Test that large images are shrunk to the configured edge"""
+        image = self._decode(prepare(Image.new("RGB", (4000, 2000), "white")))
+        assert image.size == (1568, 784)
+    
+    @staticmethod
+    def _jpeg(size):
+        buffer = io.BytesIO()
+        Image.new("RGB", size, "white").save(buffer, format="JPEG")
+        return Image.open(io.BytesIO(buffer.getvalue()))
+    
+    def test_large_jpeg_uses_draft_decode(self, prepare):
+        """Test that a large JPEG decoded at reduced scale still lands on the configured edge"""
+        image = self._decode(prepare(self._jpeg((6000, 3000))))
+        assert max(image.size) == 1568
+    
+    def test_thin_jpeg_does_not_collapse(self, prepare):
+        """Test that a JPEG whose short side scales below one pixel is still prepared"""
+        image = self._decode(prepare(self._jpeg((20000, 8))))
+        assert max(image.size) == 1568
+        assert min(image.size) >= 1
+    
+    def test_small_image_keeps_size(self, prepare):
+        """Test that images within the limit are not upscaled"""
+        image = self._decode(prepare(Image.new("RGB", (64, 32), "white")))
+        assert image.size == (64, 32)
+    
+    @pytest.mark.parametrize("mode", ["RGBA", "LA", "P"])
+    def test_transparent_background_becomes_white(self, prepare, mode):
+        """Test that dark text on a transparent background stays visible"""
+        if mode == "P":
+            # Index 0 is transparent black, index 1 is opaque black
+            image = Image.new("P", (200, 60), 0)
+            image.putpalette([0, 0, 0, 0, 0, 0])
+            image.info["transparency"] = 0
+            ImageDraw.Draw(image).rectangle((20, 20, 60, 40), fill=1)
+        else:
+            image = Image.new("RGBA", (200, 60), (0, 0, 0, 0))
+            ImageDraw.Draw(image).rectangle((20, 20, 60, 40), fill=(0, 0, 0, 255))
+            image = image.convert(mode)
         
-        # Deduct credits
+        result = self._decode(prepare(image)).convert("L")
+        assert result.getpixel((5, 5)) > 240
+        assert result.getpixel((40, 30)) < 15
+
+
+class TestOCRIntegration:
+    """OCR endpoint tests against a mocked Gemini model"""
+    
+    @pytest.fixture
+    def sample_png(self):
+        """Provide the bytes of a small PNG"""
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 32), "white").save(buffer, format="PNG")
+        return buffer.getvalue()
+    
+    @pytest.fixture
+    def sample_image(self, sample_png):
+        """Provide a small base64 encoded PNG"""
+        return base64.b64encode(sample_png).decode("utf-8")
+    
+    def test_detect_regions_rejects_invalid_base64(self, client, mock_gemini):
+        """Test that detect regions rejects an undecodable image"""
+        response = client.post(
+            "/api/detect-regions",
+            json={"imageBase64": "invalid"}
+        )
+        assert response.status_code == 500
+        assert mock_gemini.calls == []
+    
+    def test_detect_regions_parses_response(self, client, mock_gemini, sample_image):
+        """Test that a fenced JSON response is parsed into regions"""
         response = client.post(
-            f"/api/users/{user_id}/credits",
-            json={"amount": -2}
+            "/api/detect-regions",
+            json={"imageBase64": sample_image}
         )
         assert response.status_code == 200
-        assert response.json()["credits"] == initial_credits - 2
+        regions = response.json()["regions"]
+        assert len(regions) == 1
+        assert regions[0]["description"] == "Title"
+        assert regions[0]["box"] == {"ymin": 10, "xmin": 20, "ymax": 30, "xmax": 40}
+        assert len(mock_gemini.calls) == 1
     
-    def test_credits_never_negative(self):
-        """Test that credits cannot go below zero"""
-        # Create user
-        create_response = client.post(
-            "/api/users",
-            json={"email": "zero@example.com"}
+    def test_detect_regions_unparseable_response(self, client, mock_gemini, sample_image):
+        """Test that a model response that is not JSON is reported as a 400"""
+        mock_gemini.text = "not json at all"
+        response = client.post(
+            "/api/detect-regions",
+            json={"imageBase64": sample_image}
         )
-        user_id = create_response.json()["id"]
-        
-        # Try to deduct more than available
+        assert response.status_code == 400
+        assert response.json()["detail"].startswith("Invalid response format")
+    
+    def test_detect_regions_binary(self, client, mock_gemini, sample_png):
+        """Test that a multipart upload is parsed into the same regions"""
         response = client.post(
-            f"/api/users/{user_id}/credits",
-            json={"amount": -100}
+            "/api/detect-regions/binary",
+            files={"file": ("page.png", sample_png, "image/png")}
         )
         assert response.status_code == 200
-        assert response.json()["credits"] == 0
-
-
-class TestRoot:
-    """Root endpoint tests"""
+        regions = response.json()["regions"]
+        assert [r["description"] for r in regions] == ["Title"]
+        assert "base64Data" not in regions[0]
+        assert len(mock_gemini.calls) == 1
     
-    def test_root_endpoint(self):
-        """Test root API information endpoint"""
-        response = client.get("/")
+    def test_detect_regions_binary_thin_jpeg(self, client, mock_gemini):
+        """Test that a JPEG too thin to draft-decode is still accepted"""
+        buffer = io.BytesIO()
+        Image.new("RGB", (20000, 8), "white").save(buffer, format="JPEG")
+        response = client.post(
+            "/api/detect-regions/binary",
+            files={"file": ("strip.jpg", buffer.getvalue(), "image/jpeg")}
+        )
         assert response.status_code == 200
-        data = response.json()
-        assert data["name"] == "SmartLensOCR Backend API"
-        assert "version" in data
-        assert "endpoints" in data
+    
+    def test_detect_regions_binary_rejects_non_image(self, client, mock_gemini):
+        """Test that an upload that is not an image fails without calling Gemini"""
+        response = client.post(
+            "/api/detect-regions/binary",
+            files={"file": ("notes.txt", b"not an image", "text/plain")}
+        )
+        assert response.status_code == 500
+        assert mock_gemini.calls == []
+    
+    def test_process_document_returns_upload(self, client, mock_gemini, sample_png, sample_image):
+        """Test that process-document detects regions and echoes the upload as base64"""
+        response = client.post(
+            "/api/process-document",
+            files={"file": ("page.png", sample_png, "image/png")}
+        )
+        assert response.status_code == 200
+        regions = response.json()["regions"]
+        assert len(regions) == 1
+        assert regions[0]["description"] == "Title"
+        assert regions[0]["base64Data"] == sample_image
+        assert len(mock_gemini.calls) == 1
 
 
-# Integration test examples (require valid Gemini API key)
-@pytest.mark.skipif(
-    not os.getenv("GEMINI_API_KEY"),
-    reason="GEMINI_API_KEY not set"
-)
-class TestOCRIntegration:
-    """OCR endpoint integration tests"""
+@pytest.mark.remote
+@pytest.mark.slow
+@pytest.mark.xdist_group("slow")
+class TestGeminiRemote:
+    """End-to-end OCR tests against the real Gemini API (run with: pytest -m remote)"""
     
-    @pytest.fixture
-    def sample_image(self):
-        """Provide a sample image for testing"""
-        # In a real test, you'd provide an actual image
-        # For now, we'll skip actual image tests
-        pass
-    
-    def test_detect_regions_requires_api_key(self):
-        """Test that detect regions endpoint requires API key"""
-        # This test verifies the endpoint exists
+    def test_detect_regions_live(self, client, require_gemini_key):
+        """Test region detection on a generated image with real Gemini"""
+        image = Image.new("RGB", (400, 120), "white")
+        ImageDraw.Draw(image).text((20, 50), "SmartLensOCR remote test", fill="black")
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        
         response = client.post(
             "/api/detect-regions",
-            json={"imageBase64": "invalid"}
+            json={"imageBase64": base64.b64encode(buffer.getvalue()).decode("utf-8")}
         )
-        # Should be 500 (API error) or 400 (bad request)
-        assert response.status_code in [400, 500]
+        assert response.status_code == 200
+        assert isinstance(response.json()["regions"], list)
 
 
 if __name__ == "__main__":